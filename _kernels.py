@@ -0,0 +1,85 @@
+"""
+Вычислительные ядра для обработки аудио
+Используется Numba, если установлена; иначе numpy-rms или NumPy
+"""
+import math
+
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+try:
+    import numpy_rms
+except ImportError:
+    numpy_rms = None
+
+# Масштаб int16 -> [-1, 1]
+INT16_SCALE = 32768.0
+
+
+if njit is not None:
+    # Явная сигнатура: компиляция при импорте, а не при первом вызове
+    @njit('f4(f4[::1])', cache=True, fastmath=True, boundscheck=False)
+    def rms(a):
+        """RMS непрерывного float32 массива"""
+        n = a.shape[0]
+        if n == 0:
+            return 0.0
+        s = 0.0
+        for i in range(n):
+            s += a[i] * a[i]
+        return math.sqrt(s / n)
+
+    @njit('f4(i2[::1])', cache=True, fastmath=True, boundscheck=False)
+    def rms_i16(a):
+        """RMS непрерывного int16 массива в шкале [-1, 1] (целочисленный аккумулятор)"""
+        n = a.shape[0]
+        if n == 0:
+            return 0.0
+        s = 0
+        for i in range(n):
+            v = np.int64(a[i])
+            s += v * v
+        return math.sqrt(s / n) / INT16_SCALE
+
+    @njit('i8(i2[::1])', cache=True, fastmath=True, boundscheck=False)
+    def abs_sum_i16(a):
+        """Сумма модулей int16 массива"""
+        s = 0
+        for i in range(a.shape[0]):
+            v = np.int64(a[i])
+            s += v if v >= 0 else -v
+        return s
+
+elif numpy_rms is not None:
+    def rms(a):
+        """RMS непрерывного float32 массива"""
+        if a.shape[0] == 0:
+            return 0.0
+        return float(numpy_rms.rms(a, window_size=a.shape[0])[0])
+
+else:
+    def rms(a):
+        """RMS непрерывного float32 массива"""
+        if a.shape[0] == 0:
+            return 0.0
+        return float(np.sqrt(np.dot(a, a) / a.shape[0]))
+
+if njit is None:
+    def rms_i16(a):
+        """RMS непрерывного int16 массива в шкале [-1, 1]"""
+        return rms(a.astype(np.float32)) / INT16_SCALE
+
+    def abs_sum_i16(a):
+        """Сумма модулей int16 массива"""
+        return int(np.abs(a, dtype=np.int32).sum(dtype=np.int64))
+
+
+def warmup():
+    """Прогрев ядер вне аудиоцикла"""
+    rms(np.zeros(1024, dtype=np.float32))
+    rms_i16(np.zeros(1024, dtype=np.int16))
+    abs_sum_i16(np.zeros(1024, dtype=np.int16))
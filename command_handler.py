@@ -3,6 +3,7 @@
 Ядро логики
 """
 import os
+import re
 import sys
 import subprocess
 import webbrowser
@@ -10,11 +11,26 @@ import platform
 import psutil
 import datetime
 import time
+import unicodedata
 import requests
-from typing import Dict, List, Callable
+from typing import Dict, List, Callable, Optional, Tuple, Union
 import json
+from concurrent.futures import ThreadPoolExecutor
 from tts_engine import TTSEngine
 
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+# Процессы, которые не завершаются в close_all_apps
+SYSTEM_PROCESSES = frozenset({'system', 'svchost.exe', 'explorer.exe', 'taskmgr.exe'})
+
+
+def _norm(text: str) -> str:
+    """Нормализация текста команды: NFKC + casefold"""
+    return unicodedata.normalize('NFKC', text).casefold()
+
 
 class CommandHandler:
     def __init__(self, debug_mode=True, enable_tts=True):
@@ -27,7 +43,20 @@ class CommandHandler:
         """
         self.debug_mode = debug_mode
         self.enable_tts = enable_tts
+
+        # Платформа не меняется во время работы, определяем один раз
+        self._os = platform.system()
+        self._clear_cmd = 'cls' if self._os == 'Windows' else 'clear'
+        self._sys_cmds = self._initialize_system_commands()
+
         self.commands = self._initialize_commands()
+
+        # Автомат Ахо-Корасик (или регулярное выражение) для поиска команд внутри фразы
+        self._automaton = None
+        self._cmd_re = None
+        self._matcher_dirty = True
+        self._build_matcher()
+
         self.system_info = self._get_system_info()
 
         # Инициализация TTS
@@ -44,29 +73,30 @@ class CommandHandler:
                 debug_mode=self.debug_mode
             )
             self.print_debug("TTS движок инициализирован")
+            self.tts_engine.prewarm(self._static_responses())
 
         except Exception as e:
             self.print_debug(f"Ошибка инициализации TTS: {e}")
             self.tts_engine = None
 
-    def _initialize_commands(self) -> Dict[str, Callable]:
+    def _initialize_commands(self) -> Dict[str, Union[str, Callable[[], str]]]:
         """Инициализация словаря команд с большим количеством вариантов"""
         commands = {
             # Приветствия и базовые команды
-            "привет": lambda: "Привет! Чем могу помочь?",
-            "здравствуй": lambda: "Здравствуйте! Рад вас слышать.",
-            "добрый день": lambda: "Добрый день! Чем могу быть полезен?",
+            "привет": "Привет! Чем могу помочь?",
+            "здравствуй": "Здравствуйте! Рад вас слышать.",
+            "добрый день": "Добрый день! Чем могу быть полезен?",
 
             # Команды "как дела"
-            "как дела": lambda: "Всё отлично! Готова выполнять ваши команды.",
-            "как твои дела": lambda: "У меня всё прекрасно, спасибо что спросили!",
-            "как ты": lambda: "Всё хорошо, работаю в штатном режиме!",
-            "как настроение": lambda: "У меня всегда отличное настроение!",
-            "как жизнь": lambda: "Жизнь прекрасна, особенно когда могу помочь!",
+            "как дела": "Всё отлично! Готова выполнять ваши команды.",
+            "как твои дела": "У меня всё прекрасно, спасибо что спросили!",
+            "как ты": "Всё хорошо, работаю в штатном режиме!",
+            "как настроение": "У меня всегда отличное настроение!",
+            "как жизнь": "Жизнь прекрасна, особенно когда могу помочь!",
 
             # Благодарности
-            "спасибо": lambda: "Пожалуйста! Обращайтесь ещё.",
-            "благодарю": lambda: "Всегда рада помочь!",
+            "спасибо": "Пожалуйста! Обращайтесь ещё.",
+            "благодарю": "Всегда рада помочь!",
 
             # Системные команды
             "перезагрузи компьютер": self.restart_computer,
@@ -98,22 +128,74 @@ class CommandHandler:
 
             # Информационные
             "что ты умеешь": self.show_capabilities,
-            "расскажи о себе": lambda: "Я голосовой ассистент, созданный для помощи в повседневных задачах.",
-            "кто ты": lambda: "Я ваш голосовой помощник, готовый помочь с различными задачами.",
+            "расскажи о себе": "Я голосовой ассистент, созданный для помощи в повседневных задачах.",
+            "кто ты": "Я ваш голосовой помощник, готовый помочь с различными задачами.",
         }
-        return commands
+        return {_norm(cmd): handler for cmd, handler in commands.items()}
+
+    def _static_responses(self) -> List[str]:
+        """Постоянные ответы команд для предварительного синтеза речи"""
+        return list(dict.fromkeys(v for v in self.commands.values() if isinstance(v, str)))
+
+    def _build_matcher(self):
+        """
+        Построение структуры поиска по ключам словаря команд:
+        автомат Ахо-Корасик, если доступен pyahocorasick, иначе регулярное выражение
+        """
+        self._matcher_dirty = False
+        self._automaton = None
+        self._cmd_re = None
+        if not self.commands:
+            return
+
+        if ahocorasick is not None:
+            automaton = ahocorasick.Automaton()
+            for cmd in self.commands:
+                automaton.add_word(cmd, (len(cmd), cmd))
+            automaton.make_automaton()
+            self._automaton = automaton
+        else:
+            # Просмотр вперёд находит совпадения в каждой позиции, включая
+            # перекрывающиеся; длинные команды первыми - самое длинное в позиции
+            alternation = '|'.join(sorted(map(re.escape, self.commands), key=len, reverse=True))
+            self._cmd_re = re.compile(f'(?=({alternation}))')
+
+    def _find_partial_match(self, command_lower: str) -> Optional[str]:
+        """
+        Поиск команды, входящей в распознанный текст.
+        При нескольких совпадениях выбирается самое длинное.
+        """
+        if self._matcher_dirty:
+            self._build_matcher()
+
+        if self._automaton is not None:
+            best = None
+            for _, (length, cmd) in self._automaton.iter(command_lower):
+                if best is None or length > best[0]:
+                    best = (length, cmd)
+            return best[1] if best else None
+
+        if self._cmd_re is not None:
+            best = None
+            for m in self._cmd_re.finditer(command_lower):
+                if best is None or len(m.group(1)) > len(best):
+                    best = m.group(1)
+            return best
+
+        return None
 
     def execute_command(self, command_text: str) -> str:
         """
         Выполнение команды на основе распознанного текста
         """
-        command_lower = command_text.lower().strip()
+        command_lower = _norm(command_text).strip()
         self.print_debug(f"Поиск команды для: '{command_lower}'")
 
         # Поиск точного совпадения
         if command_lower in self.commands:
             try:
-                result = self.commands[command_lower]()
+                handler = self.commands[command_lower]
+                result = handler() if callable(handler) else handler
                 self.print_debug(f"Команда выполнена: {command_lower}")
                 self.speak_response(result)
                 return result
@@ -124,18 +206,19 @@ class CommandHandler:
                 return error_msg
 
         # Поиск частичного совпадения
-        for cmd, func in self.commands.items():
-            if cmd in command_lower:
-                try:
-                    result = func()
-                    self.print_debug(f"Команда выполнена (частичное совпадение): {cmd}")
-                    self.speak_response(result)
-                    return result
-                except Exception as e:
-                    error_msg = f"Ошибка выполнения команды: {e}"
-                    self.print_debug(error_msg)
-                    self.speak_response("Произошла ошибка")
-                    return error_msg
+        cmd = self._find_partial_match(command_lower)
+        if cmd is not None:
+            try:
+                handler = self.commands[cmd]
+                result = handler() if callable(handler) else handler
+                self.print_debug(f"Команда выполнена (частичное совпадение): {cmd}")
+                self.speak_response(result)
+                return result
+            except Exception as e:
+                error_msg = f"Ошибка выполнения команды: {e}"
+                self.print_debug(error_msg)
+                self.speak_response("Произошла ошибка")
+                return error_msg
 
         # Если команда не найдена
         self.print_debug(f"Команда не найдена: {command_lower}")
@@ -162,12 +245,21 @@ class CommandHandler:
 
     def _get_system_info(self) -> Dict:
         """Получение информации о системе"""
+        # Запросы могут обращаться к ОС, поэтому выполняются параллельно
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            version, architecture, processor, memory = pool.map(lambda f: f(), [
+                platform.version,
+                lambda: platform.architecture()[0],
+                platform.processor,
+                lambda: psutil.virtual_memory().total // (1024 ** 3),
+            ])
+
         return {
-            "os": platform.system(),
-            "version": platform.version(),
-            "architecture": platform.architecture()[0],
-            "processor": platform.processor(),
-            "memory": f"{psutil.virtual_memory().total // (1024 ** 3)} GB"
+            "os": self._os,
+            "version": version,
+            "architecture": architecture,
+            "processor": processor,
+            "memory": f"{memory} GB"
         }
 
     def print_debug(self, message: str):
@@ -176,46 +268,79 @@ class CommandHandler:
             timestamp = datetime.datetime.now().strftime("%H:%M:%S")
             print(f"[CommandHandler {timestamp}] {message}")
 
+    def _initialize_system_commands(self) -> Dict[str, Tuple[List[str], str]]:
+        """
+        Таблица системных команд для текущей ОС:
+        ключ -> (команда запуска, ответ при успехе)
+        """
+        table = {
+            "restart": {
+                "Windows": (["shutdown", "/r", "/t", "5"], "Компьютер будет перезагружен через 5 секунд"),
+                "Linux": (["sudo", "shutdown", "-r", "now"], "Компьютер перезагружается"),
+            },
+            "shutdown": {
+                "Windows": (["shutdown", "/s", "/t", "5"], "Компьютер будет выключен через 5 секунд"),
+                "Linux": (["sudo", "shutdown", "-h", "now"], "Компьютер выключается"),
+            },
+            "task_manager": {
+                "Windows": (["taskmgr"], "Диспетчер задач открыт"),
+                "Linux": (["gnome-system-monitor"], "Системный монитор открыт"),
+            },
+            "notepad": {
+                "Windows": (["notepad"], "Блокнот открыт"),
+                "Linux": (["gedit"], "Текстовый редактор открыт"),
+            },
+            "calculator": {
+                "Windows": (["calc"], "Калькулятор открыт"),
+                "Linux": (["gnome-calculator"], "Калькулятор открыт"),
+            },
+            "explorer": {
+                "Windows": (["explorer"], "Проводник открыт"),
+                "Linux": (["nautilus"], "Файловый менеджер открыт"),
+            },
+        }
+        return {key: variants[self._os] for key, variants in table.items() if self._os in variants}
+
+    def _launch(self, args: List[str]):
+        """Запуск приложения без ожидания его завершения"""
+        if self._os == "Windows" and len(args) == 1:
+            # Через ShellExecute: приложения с манифестом highestAvailable
+            # (taskmgr) при прямом CreateProcess падают с WinError 740
+            os.startfile(args[0])
+            return
+        creationflags = subprocess.DETACHED_PROCESS if self._os == "Windows" else 0
+        subprocess.Popen(args, close_fds=True, creationflags=creationflags)
+
+    def _run_system_command(self, key: str, unsupported_msg: str) -> str:
+        """Запуск команды из таблицы системных команд"""
+        entry = self._sys_cmds.get(key)
+        if entry is None:
+            return unsupported_msg
+
+        args, ok_msg = entry
+        try:
+            self._launch(args)
+        except OSError as e:
+            self.print_debug(f"Ошибка запуска {args[0]}: {e}")
+            return f"Не удалось запустить {args[0]}"
+        return ok_msg
+
     # === СИСТЕМНЫЕ КОМАНДЫ ===
 
     def restart_computer(self) -> str:
         """Перезагрузка компьютера"""
         self.print_debug("Выполняется перезагрузка компьютера...")
-
-        if platform.system() == "Windows":
-            os.system("shutdown /r /t 5")
-            return "Компьютер будет перезагружен через 5 секунд"
-        elif platform.system() == "Linux":
-            os.system("sudo shutdown -r now")
-            return "Компьютер перезагружается"
-        else:
-            return "Перезагрузка не поддерживается на этой системе"
+        return self._run_system_command("restart", "Перезагрузка не поддерживается на этой системе")
 
     def shutdown_computer(self) -> str:
         """Выключение компьютера"""
         self.print_debug("Выполняется выключение компьютера...")
-
-        if platform.system() == "Windows":
-            os.system("shutdown /s /t 5")
-            return "Компьютер будет выключен через 5 секунд"
-        elif platform.system() == "Linux":
-            os.system("sudo shutdown -h now")
-            return "Компьютер выключается"
-        else:
-            return "Выключение не поддерживается на этой системе"
+        return self._run_system_command("shutdown", "Выключение не поддерживается на этой системе")
 
     def open_task_manager(self) -> str:
         """Открытие диспетчера задач"""
         self.print_debug("Открываю диспетчер задач...")
-
-        if platform.system() == "Windows":
-            os.system("taskmgr")
-            return "Диспетчер задач открыт"
-        elif platform.system() == "Linux":
-            os.system("gnome-system-monitor")
-            return "Системный монитор открыт"
-        else:
-            return "Диспетчер задач не поддерживается на этой системе"
+        return self._run_system_command("task_manager", "Диспетчер задач не поддерживается на этой системе")
 
     def show_system_info(self) -> str:
         """Показ системной информации"""
@@ -233,7 +358,7 @@ class CommandHandler:
 
     def clear_screen(self) -> str:
         """Очистка экрана терминала"""
-        os.system('cls' if platform.system() == 'Windows' else 'clear')
+        os.system(self._clear_cmd)
         self.print_debug("Экран очищен")
         return "Экран очищен"
 
@@ -242,41 +367,17 @@ class CommandHandler:
     def open_notepad(self) -> str:
         """Открытие блокнота"""
         self.print_debug("Открываю блокнот...")
-
-        if platform.system() == "Windows":
-            os.system("notepad")
-            return "Блокнот открыт"
-        elif platform.system() == "Linux":
-            os.system("gedit")
-            return "Текстовый редактор открыт"
-        else:
-            return "Блокнот не поддерживается на этой системе"
+        return self._run_system_command("notepad", "Блокнот не поддерживается на этой системе")
 
     def open_calculator(self) -> str:
         """Открытие калькулятора"""
         self.print_debug("Открываю калькулятор...")
-
-        if platform.system() == "Windows":
-            os.system("calc")
-            return "Калькулятор открыт"
-        elif platform.system() == "Linux":
-            os.system("gnome-calculator")
-            return "Калькулятор открыт"
-        else:
-            return "Калькулятор не поддерживается на этой системе"
+        return self._run_system_command("calculator", "Калькулятор не поддерживается на этой системе")
 
     def open_explorer(self) -> str:
         """Открытие проводника"""
         self.print_debug("Открываю проводник...")
-
-        if platform.system() == "Windows":
-            os.system("explorer")
-            return "Проводник открыт"
-        elif platform.system() == "Linux":
-            os.system("nautilus")
-            return "Файловый менеджер открыт"
-        else:
-            return "Проводник не поддерживается на этой системе"
+        return self._run_system_command("explorer", "Проводник не поддерживается на этой системе")
 
     def open_browser(self) -> str:
         """Открытие браузера по умолчанию"""
@@ -293,22 +394,15 @@ class CommandHandler:
         self.print_debug("Закрываю приложения...")
 
         try:
-            processes = []
-            for proc in psutil.process_iter(['pid', 'name']):
-                try:
-                    processes.append(proc)
-                except (psutil.NoSuchProcess, psutil.AccessDenied):
-                    pass
-
             closed_count = 0
-            system_processes = ['system', 'svchost.exe', 'explorer.exe', 'taskmgr.exe']
-
-            for proc in processes:
+            for proc in psutil.process_iter(['name']):
+                name = (proc.info['name'] or '').lower()
+                if not name or name in SYSTEM_PROCESSES:
+                    continue
                 try:
-                    if proc.info['name'].lower() not in system_processes:
-                        proc.terminate()
-                        closed_count += 1
-                except:
+                    proc.terminate()
+                    closed_count += 1
+                except (psutil.NoSuchProcess, psutil.AccessDenied):
                     continue
 
             return f"Закрыто приложений: {closed_count}"
@@ -351,15 +445,16 @@ class CommandHandler:
 
     # === ДОПОЛНИТЕЛЬНЫЕ МЕТОДЫ ===
 
-    def add_custom_command(self, command: str, function: Callable):
+    def add_custom_command(self, command: str, function: Union[str, Callable[[], str]]):
         """
         Добавление пользовательской команды
 
         Args:
             command (str): Текст команды
-            function (Callable): Функция-обработчик
+            function (Union[str, Callable]): Функция-обработчик или готовый ответ
         """
-        self.commands[command.lower()] = function
+        self.commands[_norm(command).strip()] = function
+        self._matcher_dirty = True
         self.print_debug(f"Добавлена пользовательская команда: {command}")
 
     def remove_command(self, command: str):
@@ -369,8 +464,10 @@ class CommandHandler:
         Args:
             command (str): Текст команды для удаления
         """
-        if command.lower() in self.commands:
-            del self.commands[command.lower()]
+        key = _norm(command).strip()
+        if key in self.commands:
+            del self.commands[key]
+            self._matcher_dirty = True
             self.print_debug(f"Команда удалена: {command}")
         else:
             self.print_debug(f"Команда для удаления не найдена: {command}")
\ No newline at end of file
@@ -3,9 +3,32 @@
 """
 import json
 import os
+import threading
+import weakref
 from vosk import Model, KaldiRecognizer
 import numpy as np
 
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    json_loads = json.loads
+
+# Загруженные модели по пути: экземпляры распознавателя используют одну модель
+_MODEL_CACHE = weakref.WeakValueDictionary()
+_MODEL_LOCK = threading.Lock()
+
+
+def _get_model(model_path):
+    """Получение модели Vosk из кэша или её загрузка"""
+    key = os.path.abspath(model_path)
+    with _MODEL_LOCK:
+        model = _MODEL_CACHE.get(key)
+        if model is None:
+            model = Model(model_path)
+            _MODEL_CACHE[key] = model
+        return model
+
+
 class SpeechRecognizer():
     def __init__(self, model_path, sample_rate=16000, debug_mode=True):
         """
@@ -22,7 +45,51 @@ class SpeechRecognizer():
         self.recognizer = None
         self.model_path = model_path
 
-        self.setup_model(model_path)
+        # Результаты потокового распознавания
+        self._segments = []
+        self.partial_text = ""
+        # Часть фрагментов пропущена, пока модель ещё загружалась
+        self.stream_incomplete = False
+
+        # Переиспользуемые буферы для преобразования float -> int16
+        self._scratch_f32 = np.empty(0, dtype=np.float32)
+        self._scratch_i16 = np.empty(0, dtype=np.int16)
+
+        # Модель загружается в фоне, чтобы не задерживать запуск
+        if not os.path.exists(model_path):
+            self.print_debug(f"Модель Vosk не найдена по пути: {model_path}")
+            raise FileNotFoundError(f"Модель Vosk не найдена по пути: {model_path}")
+
+        self._ready_event = threading.Event()
+        # Ошибка фоновой загрузки, сообщается один раз при обращении
+        self._load_error = None
+        self._load_error_reported = False
+        self._loader_thread = threading.Thread(target=self._load_model, args=(model_path,), daemon=True)
+        self._loader_thread.start()
+
+
+    def _load_model(self, model_path):
+        """Фоновая загрузка модели"""
+        try:
+            self.setup_model(model_path)
+        except Exception as e:
+            self._load_error = e
+        finally:
+            self._ready_event.set()
+
+
+    def wait_ready(self, timeout=None):
+        """
+        Ожидание окончания загрузки модели
+
+        Returns:
+            bool: True, если распознаватель готов к работе
+        """
+        self._ready_event.wait(timeout)
+        if self._load_error is not None and not self._load_error_reported:
+            self._load_error_reported = True
+            self.print_debug(f"Модель Vosk не загружена: {self._load_error}")
+        return self.recognizer is not None
 
 
     def setup_model(self, model_path):
@@ -31,7 +98,7 @@ class SpeechRecognizer():
             if not os.path.exists(model_path):
                 raise FileNotFoundError(f"Модель Vosk не найдена по пути: {model_path}")
 
-            self.model = Model(model_path)
+            self.model = _get_model(model_path)
             self.recognizer = KaldiRecognizer(self.model, self.sample_rate)
             self.recognizer.SetWords(True)  # Включаем распознавание отдельных слов
 
@@ -49,33 +116,70 @@ class SpeechRecognizer():
             print(f"[Vosk] {message}")
 
 
-    def recognize_audio(self, audio_data):
+    def _to_bytes(self, audio_data):
+        """Преобразование аудиоданных в байты PCM int16 для Vosk"""
+        if audio_data.dtype == np.float32 or audio_data.dtype == np.float64:
+            n = audio_data.size
+            if self._scratch_f32.size < n:
+                self._scratch_f32 = np.empty(n, dtype=np.float32)
+                self._scratch_i16 = np.empty(n, dtype=np.int16)
+
+            scratch_f32 = self._scratch_f32[:n]
+            audio_int16 = self._scratch_i16[:n]
+            np.clip(audio_data.reshape(-1), -1.0, 1.0, out=scratch_f32)
+            np.multiply(scratch_f32, 32767.0, out=scratch_f32)
+            np.copyto(audio_int16, scratch_f32, casting='unsafe')
+        else:
+            audio_int16 = audio_data.astype(np.int16, copy=False)
+
+        # AcceptWaveform (cffi) принимает только bytes, поэтому копия здесь неизбежна
+        return audio_int16.tobytes()
+
+
+    def accept_chunk(self, audio_chunk):
         """
-        Распознавание речи из аудиоданных
+        Потоковая подача фрагмента аудио в распознаватель
 
         Args:
-            audio_data (np.array): Аудиоданные в формате float32/int16
+            audio_chunk (np.array): Фрагмент аудио в формате float32/int16
+        """
+        # Без ожидания: вызывается из цикла записи, который нельзя задерживать
+        if not self._ready_event.is_set() or self.recognizer is None:
+            self.stream_incomplete = True
+            return
+
+        try:
+            if self.recognizer.AcceptWaveform(self._to_bytes(audio_chunk)):
+                text = json_loads(self.recognizer.Result()).get("text", "").strip()
+                if text:
+                    self._segments.append(text)
+                self.partial_text = ""
+            else:
+                self.partial_text = json_loads(self.recognizer.PartialResult()).get("partial", "")
+
+        except Exception as e:
+            self.print_debug(f"Ошибка потокового распознавания: {e}")
+
+
+    def final_result(self):
+        """
+        Завершение распознавания переданных фрагментов
 
         Returns:
             str: Распознанный текст или пустая строка
         """
-        if self.recognizer is None:
+        if not self.wait_ready():
             self.print_debug("Распознаватель не инициализирован")
             return ""
 
         try:
-            if audio_data.dtype == np.float32 or audio_data.dtype == np.float64:
-                audio_int16 = (audio_data * 32767).astype(np.int16)
-            else:
-                audio_int16 = audio_data.astype(np.int16)
-
-            audio_bytes = audio_int16.tobytes()
+            text = json_loads(self.recognizer.FinalResult()).get("text", "").strip()
+            if text:
+                self._segments.append(text)
 
-            self.recognizer.AcceptWaveform(audio_bytes)
-            result = self.recognizer.FinalResult()
-
-            result_dict = json.loads(result)
-            recognized_text = result_dict.get("text", "").strip()
+            recognized_text = " ".join(self._segments)
+            self._segments = []
+            self.partial_text = ""
 
             if recognized_text:
                 self.print_debug(f"Распознано: '{recognized_text}'")
@@ -87,7 +191,28 @@ class SpeechRecognizer():
             return ""
 
 
+    def recognize_audio(self, audio_data):
+        """
+        Распознавание речи из аудиоданных
+
+        Args:
+            audio_data (np.array): Аудиоданные в формате float32/int16
+
+        Returns:
+            str: Распознанный текст или пустая строка
+        """
+        if not self.wait_ready():
+            self.print_debug("Распознаватель не инициализирован")
+            return ""
+
+        self.accept_chunk(audio_data)
+        return self.final_result()
+
+
     def reset_recognizer(self):
         """Сброс состояния распознавателя (полезно между командами)"""
+        self._segments = []
+        self.partial_text = ""
+        self.stream_incomplete = False
         if self.recognizer:
             self.recognizer.Reset()
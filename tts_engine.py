@@ -2,10 +2,27 @@ import pyttsx3
 import threading
 import queue
 import time
-from typing import Optional
+import os
+import re
+import wave
+import hashlib
+import tempfile
+from collections import OrderedDict
+from typing import Iterable, Optional
+
+import numpy as np
+import sounddevice as sd
+
+# Замены для произношения; любая последовательность точек сводится к одной
+_REPLACEMENTS = {
+    'GB': 'гигабайт',
+    'MB': 'мегабайт',
+}
 
 
 class TTSEngine:
+    AUDIO_CACHE_SIZE = 200
+
     def __init__(self, rate=150, volume=0.9, voice_id=None, debug_mode=True):
         """
         Инициализация локального TTS движка
@@ -14,15 +31,50 @@ class TTSEngine:
         self.engine = None
         self.is_speaking = False
         self.speech_queue = queue.Queue()
+        # Предварительный синтез обрабатывается только при пустой speech_queue
+        self._prewarm_queue = queue.Queue()
+        # Во время синтеза в файл события pyttsx3 не означают воспроизведение
+        self._synthesizing = False
+        # Синтез в файл не работает на этом драйвере: сразу прямое воспроизведение
+        self._file_synth_failed = False
         self.last_speech_time = 0
         self.speech_lock = threading.Lock()
+        self._done_event = threading.Event()
+        self._done_event.set()
         self._shutdown_flag = False
 
-        self.setup_engine(rate, volume, voice_id)
+        # Регулярные выражения для очистки текста
+        self._clean_re = re.compile(r'\.{2,}|GB|MB')
+        self._ws_re = re.compile(r'\s+')
+
+        # LRU-кэш синтезированной речи: ключ -> (pcm int16, sample rate)
+        self._audio_cache: "OrderedDict[str, tuple[np.ndarray, int]]" = OrderedDict()
+        self._voice_sig = b""
 
-        self.worker_thread = threading.Thread(target=self._process_queue, daemon=True)
+        # Движок создаётся в рабочем потоке; фразы копятся в очереди до готовности
+        self._ready_event = threading.Event()
+        self._init_failed = False
+
+        self.worker_thread = threading.Thread(target=self._run, args=(rate, volume, voice_id), daemon=True)
         self.worker_thread.start()
 
+    def _run(self, rate: int, volume: float, voice_id: Optional[int]):
+        """Инициализация движка и обработка очереди в рабочем потоке"""
+        try:
+            self.setup_engine(rate, volume, voice_id)
+        except Exception:
+            self._init_failed = True
+            return
+        finally:
+            self._ready_event.set()
+
+        self._process_queue()
+
+    def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        """Ожидание инициализации движка"""
+        self._ready_event.wait(timeout)
+        return self.engine is not None
+
     def setup_engine(self, rate: int, volume: float, voice_id: Optional[int]):
         """Настройка TTS движка"""
         try:
@@ -47,6 +99,12 @@ class TTSEngine:
                         self.engine.setProperty('voice', voices[0].id)
                         self.print_debug(f"Выбран голос по умолчанию: {voices[0].name}")
 
+            self._voice_sig = (
+                f"{self.engine.getProperty('rate')}|"
+                f"{self.engine.getProperty('volume')}|"
+                f"{self.engine.getProperty('voice')}"
+            ).encode()
+
             self.engine.connect('started-utterance', self._on_start_speech)
             self.engine.connect('finished-utterance', self._on_end_speech)
 
@@ -56,17 +114,28 @@ class TTSEngine:
             self.print_debug(f"Ошибка инициализации TTS: {e}")
             raise
 
+    def _set_speaking(self, speaking: bool):
+        """Обновление флага воспроизведения и события его завершения"""
+        with self.speech_lock:
+            self.is_speaking = speaking
+            if speaking:
+                self._done_event.clear()
+            else:
+                self._done_event.set()
+
     def _on_start_speech(self, name='tts_message'):
         """Обработчик начала речи"""
+        if self._synthesizing:
+            return
         self.print_debug("Начало воспроизведения речи")
-        with self.speech_lock:
-            self.is_speaking = True
+        self._set_speaking(True)
 
     def _on_end_speech(self, name='tts_message'):
         """Обработчик окончания речи"""
+        if self._synthesizing:
+            return
         self.print_debug("Окончание воспроизведения речи")
-        with self.speech_lock:
-            self.is_speaking = False
+        self._set_speaking(False)
 
     def print_debug(self, message: str):
         """Вывод отладочной информации"""
@@ -77,7 +146,7 @@ class TTSEngine:
         """
         Произнесение текста
         """
-        if not text or self.engine is None or self._shutdown_flag:
+        if not text or self._init_failed or self._shutdown_flag:
             return
 
         cleaned_text = self._clean_text(text)
@@ -85,82 +154,173 @@ class TTSEngine:
         self.speech_queue.put(cleaned_text)
         self.print_debug(f"Добавлено в очередь: '{cleaned_text[:30]}...'")
 
+    def prewarm(self, texts: Iterable[str]):
+        """
+        Предварительный синтез фраз в кэш без воспроизведения
+        """
+        if self._init_failed or self._shutdown_flag:
+            return
+
+        for text in texts:
+            if text:
+                self._prewarm_queue.put(self._clean_text(text))
+
+    def _cache_key(self, cleaned_text: str) -> str:
+        """Ключ кэша: текст + параметры голоса"""
+        return hashlib.blake2b(cleaned_text.encode() + self._voice_sig).hexdigest()
+
+    def _synthesize(self, text: str):
+        """Синтез текста в WAV через pyttsx3 и чтение в массив int16"""
+        fd, path = tempfile.mkstemp(suffix='.wav')
+        os.close(fd)
+        try:
+            self._synthesizing = True
+            try:
+                self.engine.save_to_file(text, path)
+                self.engine.runAndWait()
+            finally:
+                self._synthesizing = False
+
+            with wave.open(path, 'rb') as wav:
+                if wav.getsampwidth() != 2:
+                    raise ValueError(f"Неподдерживаемая разрядность WAV: {wav.getsampwidth()}")
+                channels = wav.getnchannels()
+                samplerate = wav.getframerate()
+                frames = wav.readframes(wav.getnframes())
+
+            pcm = np.frombuffer(frames, dtype=np.int16).reshape(-1, channels)
+            if pcm.size == 0:
+                raise ValueError("Пустой результат синтеза")
+            return pcm, samplerate
+        finally:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _get_audio(self, text: str):
+        """Получение аудио из кэша или синтез с сохранением в кэш"""
+        key = self._cache_key(text)
+        cached = self._audio_cache.get(key)
+        if cached is not None:
+            self._audio_cache.move_to_end(key)
+            self.print_debug("Аудио взято из кэша")
+            return cached
+
+        audio = self._synthesize(text)
+        self._audio_cache[key] = audio
+        if len(self._audio_cache) > self.AUDIO_CACHE_SIZE:
+            self._audio_cache.popitem(last=False)
+        return audio
+
+    def _play(self, pcm: np.ndarray, samplerate: int):
+        """Воспроизведение PCM через sounddevice"""
+        self._set_speaking(True)
+        try:
+            sd.play(pcm, samplerate)
+            sd.wait()
+        finally:
+            self._set_speaking(False)
+
+    def _next_item(self):
+        """Следующая фраза: живая речь в приоритете перед предварительным синтезом"""
+        try:
+            return self.speech_queue.get_nowait(), True
+        except queue.Empty:
+            pass
+        try:
+            return self._prewarm_queue.get_nowait(), False
+        except queue.Empty:
+            pass
+        return self.speech_queue.get(timeout=0.5), True
+
     def _process_queue(self):
         """Фоновая обработка очереди сообщений"""
         while not self._shutdown_flag:
             try:
-                text = self.speech_queue.get(timeout=0.5)
-                if text and not self._shutdown_flag:
+                text, play = self._next_item()
+                if not text or self._shutdown_flag:
+                    continue
+
+                if self._file_synth_failed:
+                    if play:
+                        self._say(text)
+                    continue
+
+                try:
+                    pcm, samplerate = self._get_audio(text)
+                except Exception as e:
+                    self.print_debug(f"Ошибка синтеза в файл, далее используется прямое воспроизведение: {e}")
+                    self._file_synth_failed = True
+                    if play:
+                        self._say(text)
+                    continue
+
+                if play:
                     self.print_debug(f"Начинаю говорить: '{text[:50]}...'")
                     self.last_speech_time = time.time()
-
                     try:
-                        self.engine.startLoop(False)
+                        self._play(pcm, samplerate)
+                        self.print_debug("Речь завершена успешно")
+                    except Exception as e:
+                        self.print_debug(f"Ошибка при воспроизведении, используется pyttsx3: {e}")
+                        self._say(text)
 
-                        self.engine.say(text)
+            except queue.Empty:
+                continue
+            except Exception as e:
+                self.print_debug(f"Ошибка в обработке очереди: {e}")
+                self._set_speaking(False)
 
-                        start_time = time.time()
-                        while self.engine.isBusy():
-                            self.engine.iterate()
+    def _say(self, text: str):
+        """Прямое воспроизведение через pyttsx3 без кэширования"""
+        self.print_debug(f"Начинаю говорить: '{text[:50]}...'")
+        self.last_speech_time = time.time()
 
-                            # Таймаут на случай зависания
-                            if time.time() - start_time > 10.0:  # 10 секунд таймаут
-                                self.print_debug("Таймаут речи")
-                                break
+        # Таймаут на случай зависания
+        watchdog = threading.Timer(10.0, self._on_speech_timeout)
+        watchdog.daemon = True
 
-                        self.engine.endLoop()
+        try:
+            self.engine.say(text)
+            watchdog.start()
+            self.engine.runAndWait()
 
-                        self.print_debug("Речь завершена успешно")
+            self.print_debug("Речь завершена успешно")
 
-                    except Exception as e:
-                        self.print_debug(f"Ошибка при воспроизведении: {e}")
-                        try:
-                            self.engine.endLoop()
-                        except:
-                            pass
+        except Exception as e:
+            self.print_debug(f"Ошибка при воспроизведении: {e}")
 
-                    finally:
-                        with self.speech_lock:
-                            self.is_speaking = False
+        finally:
+            watchdog.cancel()
+            self._set_speaking(False)
 
-            except queue.Empty:
-                continue
-            except Exception as e:
-                self.print_debug(f"Ошибка в обработке очереди: {e}")
-                with self.speech_lock:
-                    self.is_speaking = False
+    def _on_speech_timeout(self):
+        """Прерывание зависшего воспроизведения"""
+        self.print_debug("Таймаут речи")
+        try:
+            self.engine.stop()
+        except Exception as e:
+            self.print_debug(f"Ошибка при остановке: {e}")
 
     def _clean_text(self, text: str) -> str:
         """Очистка текста для лучшего произношения"""
-        replacements = {
-            '...': '.',
-            '..': '.',
-            'GB': 'гигабайт',
-            'MB': 'мегабайт',
-        }
-
-        cleaned = text
-        for old, new in replacements.items():
-            cleaned = cleaned.replace(old, new)
-
-        cleaned = ' '.join(cleaned.split())
-        return cleaned
+        cleaned = self._clean_re.sub(lambda m: _REPLACEMENTS.get(m.group(0), '.'), text)
+        return self._ws_re.sub(' ', cleaned).strip()
 
     def _finished(self, timeout: float = 10.0) -> bool:
         """
         Ожидание завершения текущего воспроизведения
         """
-        start_time = time.time()
-        while self.is_speaking:
-            if time.time() - start_time > timeout:
-                self.print_debug("Таймаут ожидания завершения речи")
-                return False
-            time.sleep(0.1)
+        if not self._done_event.wait(timeout):
+            self.print_debug("Таймаут ожидания завершения речи")
+            return False
         return True
 
     def get_status(self):
         """Получение статуса TTS"""
         return {
+            'is_ready': self.engine is not None,
             'is_speaking': self.is_speaking,
             'queue_size': self.speech_queue.qsize(),
             'last_speech_time': self.last_speech_time
@@ -168,6 +328,11 @@ class TTSEngine:
 
     def stop(self):
         """Остановка воспроизведения"""
+        try:
+            sd.stop()
+        except Exception as e:
+            self.print_debug(f"Ошибка при остановке воспроизведения: {e}")
+
         if self.engine:
             try:
                 self.engine.stop()
@@ -175,8 +340,7 @@ class TTSEngine:
             except Exception as e:
                 self.print_debug(f"Ошибка при остановке: {e}")
 
-        with self.speech_lock:
-            self.is_speaking = False
+        self._set_speaking(False)
 
     def shutdown(self):
         """Полное выключение TTS движка"""
@@ -184,11 +348,12 @@ class TTSEngine:
         self._shutdown_flag = True
         self.stop()
 
-        while not self.speech_queue.empty():
-            try:
-                self.speech_queue.get_nowait()
-            except queue.Empty:
-                break
+        for pending in (self.speech_queue, self._prewarm_queue):
+            while True:
+                try:
+                    pending.get_nowait()
+                except queue.Empty:
+                    break
 
         if self.engine:
             try:
@@ -1,4 +1,9 @@
+import atexit
+import ctypes
 import queue
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import time
 
@@ -7,13 +12,31 @@ import pvporcupine
 import scipy
 import sounddevice as sd
 
+import _kernels
 from stt_engine import SpeechRecognizer
 from command_handler import CommandHandler
 
 from keys import PORCUPINE_ACCESS_TOKEN
 
 
+def _rms(audio_chunk):
+    """RMS аудио-фрагмента (в шкале [-1, 1]) за один проход без временных массивов"""
+    audio_chunk = audio_chunk.reshape(-1)
+    if audio_chunk.dtype == np.int16:
+        return float(_kernels.rms_i16(np.ascontiguousarray(audio_chunk)))
+    return float(_kernels.rms(np.ascontiguousarray(audio_chunk, dtype=np.float32)))
+
+
 class VoiceActivation:
+    # Длительность кольцевого аудиобуфера, сек
+    RING_SECONDS = 4
+    # Максимальная длительность записи команды, сек
+    MAX_RECORD_SECONDS = 30
+    # Число подряд тихих блоков, после которого Porcupine пропускается
+    KW_GATE_HANGOVER = 8
+    # Максимальное число блоков, обрабатываемых за один шаг записи
+    RECORD_BATCH = 8
+
     def __init__(self, sample_rate=16000, channels=1,
                  silence_threshold=0.01, silence_duration=2.0,
                  activation_keyword="emily", debug_mode=True,
@@ -28,8 +51,18 @@ class VoiceActivation:
         self.activation_keyword = activation_keyword.lower()
         self.debug_mode = debug_mode
 
-        # Очередь для аудиоданных
-        self.audio_queue = queue.Queue()
+        # Кольцевой буфер блоков аудиоданных (выделяется при запуске потока);
+        # счётчики записи/чтения считают блоки
+        self._ring = np.zeros((0, 0), dtype=np.int16)
+        self._ring_mask = 0
+        # RMS каждого слота, считается один раз в audio_callback
+        self._ring_level = np.zeros(0, dtype=np.float32)
+        self._ring_w = 0
+        self._ring_r = 0
+        # Позиция записи в момент срабатывания ключевого слова (пишет callback)
+        self._wake_pos = 0
+        self._ring_event = threading.Event()
+        self._wake_event = threading.Event()
 
         # Флаги состояния
         self.is_listening = False
@@ -39,9 +72,28 @@ class VoiceActivation:
         # Адаптация к шуму
         self.noise_profile = None
         self.noise_adapted = False
+        self._noise_abs_sum = 0
+        self._noise_count = 0
+
+        # Пороги пересчитываются только при адаптации к шуму
+        self._silence_thresh = self.silence_threshold
+        self._fallback_thresh = 0.05
+        # Порог «заведомой тишины», ниже которого Porcupine не вызывается
+        self._kw_gate_thresh = 0.0
+        self._kw_silent_frames = 0
 
         # Статистика
         self.activation_count = 0
+        self._frame_idx = 0
+
+        # Отладочные сообщения из аудиоцикла выводятся фоновым потоком
+        self._debug_log = deque(maxlen=256)
+        self._debug_event = threading.Event()
+        if self.debug_mode:
+            threading.Thread(target=self._drain_debug_log, daemon=True).start()
+
+        # Компиляция вычислительных ядер до начала прослушивания
+        _kernels.warmup()
 
         # Porcupine настройки
         self.porcupine_access_key = PORCUPINE_ACCESS_TOKEN
@@ -49,8 +101,14 @@ class VoiceActivation:
 
         # Инициализация Porcupine
         self.porcupine = None
+        self._pv_process = None
+        self._kw_buf = np.zeros(0, dtype=np.int16)
+        self._kw_fill = 0
         self.setup_porcupine()
 
+        # Буфер записи команды (не более MAX_RECORD_SECONDS)
+        self._record_buf = np.empty(int(self.sample_rate * self.MAX_RECORD_SECONDS), dtype=np.int16)
+
         # Инициализация распознавателя речи Vosk
         self.speech_recognizer = None
         self.setup_speech_recognizer(vosk_model_path)
@@ -58,6 +116,17 @@ class VoiceActivation:
         # Инициализация обработчика команд с TTS
         self.command_handler = CommandHandler(debug_mode=debug_mode, enable_tts=True)
 
+        # Команды выполняются по одной, в порядке поступления
+        self._cmd_pool = ThreadPoolExecutor(max_workers=1)
+
+        # Журнал времени отклика пишется фоновым потоком
+        # (файл открывается при первой записи)
+        self._log_fp = None
+        self._log_queue = queue.Queue()
+        self._log_thread = threading.Thread(target=self._log_writer, daemon=True)
+        self._log_thread.start()
+        atexit.register(self._close_log)
+
     def setup_porcupine(self):
         """Инициализация Porcupine для детектирования ключевых слов"""
         try:
@@ -71,6 +140,12 @@ class VoiceActivation:
             self.print_debug(f"Требуемая sample rate: {self.porcupine.sample_rate}")
             self.print_debug(f"Размер фрейма: {self.porcupine.frame_length}")
 
+            # Накопитель неполного фрейма между блоками аудиопотока
+            self._kw_buf = np.zeros(self.porcupine.frame_length, dtype=np.int16)
+            self._kw_fill = 0
+
+            self._setup_porcupine_process()
+
             # Обновляем sample_rate если нужно
             if self.sample_rate != self.porcupine.sample_rate:
                 self.print_debug(f"Обновляем sample rate с {self.sample_rate} на {self.porcupine.sample_rate}")
@@ -80,6 +155,43 @@ class VoiceActivation:
             self.print_debug(f"Ошибка инициализации Porcupine: {e}")
             self.print_debug("Используется fallback детектор")
 
+    def _setup_porcupine_process(self):
+        """
+        Подготовка прямого вызова pv_porcupine_process через ctypes.
+        Обёртка pvporcupine копирует каждый фрейм поэлементно в массив ctypes;
+        здесь в библиотеку передаётся указатель на данные numpy без копирования.
+        Если внутреннее устройство pvporcupine отличается, используется process()
+        """
+        process_func = getattr(self.porcupine, '_process_func', None)
+        handle = getattr(self.porcupine, '_handle', None)
+        statuses = getattr(self.porcupine, 'PicovoiceStatuses', None)
+        if process_func is None or handle is None or statuses is None:
+            self.print_debug("Прямой вызов Porcupine недоступен, используется process()")
+            return
+
+        self._pv_process = process_func
+        self._pv_handle = handle
+        self._pv_success = statuses.SUCCESS
+        self._pv_result = ctypes.c_int()
+        self._pv_pcm_type = ctypes.POINTER(ctypes.c_short)
+        self._int16_buf = np.zeros(self.porcupine.frame_length, dtype=np.int16)
+
+    def _porcupine_process(self, frame):
+        """Обработка одного фрейма Porcupine, возвращает индекс ключевого слова или -1"""
+        if self._pv_process is None:
+            return self.porcupine.process(frame)
+
+        if not frame.flags.c_contiguous:
+            np.copyto(self._int16_buf, frame)
+            frame = self._int16_buf
+
+        status = self._pv_process(self._pv_handle,
+                                  frame.ctypes.data_as(self._pv_pcm_type),
+                                  ctypes.byref(self._pv_result))
+        if status != self._pv_success:
+            raise RuntimeError(f"Porcupine вернул статус {status}")
+        return self._pv_result.value
+
     def setup_speech_recognizer(self, model_path):
         """Инициализация распознавателя речи Vosk"""
         try:
@@ -88,7 +200,7 @@ class VoiceActivation:
                 sample_rate=self.sample_rate,
                 debug_mode=self.debug_mode
             )
-            self.print_debug("Распознаватель речи Vosk инициализирован")
+            self.print_debug("Загрузка модели Vosk начата в фоне")
         except Exception as e:
             self.print_debug(f"Ошибка инициализации Vosk: {e}")
             self.print_debug("Распознавание речи будет отключено")
@@ -99,6 +211,25 @@ class VoiceActivation:
             timestamp = datetime.now().strftime("%H:%M:%S")
             print(f"[{timestamp}] {message}")
 
+    def print_debug_hot(self, fmt, *args):
+        """
+        Отладочное сообщение из горячего пути: без форматирования и вывода
+        в вызывающем потоке, строка собирается при выводе
+        """
+        if self.debug_mode:
+            self._debug_log.append((time.time(), fmt, args))
+            self._debug_event.set()
+
+    def _drain_debug_log(self):
+        """Фоновый вывод отложенных отладочных сообщений"""
+        while True:
+            self._debug_event.wait()
+            self._debug_event.clear()
+            while self._debug_log:
+                ts, fmt, args = self._debug_log.popleft()
+                timestamp = datetime.fromtimestamp(ts).strftime("%H:%M:%S")
+                print(f"[{timestamp}] {fmt.format(*args)}")
+
     def setup_audio_device(self):
         """Настройка аудиоустройства"""
         try:
@@ -118,75 +249,165 @@ class VoiceActivation:
             self.print_debug(f"Ошибка настройки аудиоустройства: {e}")
             return False
 
+    def _reset_ring(self, blocksize):
+        """Выделение кольцевого буфера под блоки аудиопотока"""
+        # Число слотов - степень двойки, индекс слота берётся маской
+        slots = 1 << max(0, int(self.RING_SECONDS * self.sample_rate) // blocksize - 1).bit_length()
+        self._ring_mask = slots - 1
+        self._ring = np.zeros((slots, blocksize), dtype=np.int16)
+        self._ring_level = np.zeros(slots, dtype=np.float32)
+        self._ring_w = 0
+        self._ring_r = 0
+        self._wake_pos = 0
+        self._ring_event.clear()
+        self._wake_event.clear()
+
     def audio_callback(self, indata, frames, time, status):
-        """Callback-функция для получения аудиоданных"""
+        """
+        Callback-функция аудиопотока: запись в кольцевой буфер и
+        детектирование ключевого слова прямо в потоке PortAudio
+        """
         if status:
-            self.print_debug(f"Аудио статус: {status}")
+            self.print_debug_hot("Аудио статус: {}", status)
+
+        # Представление буфера PortAudio без копирования
+        samples = np.frombuffer(indata, dtype=np.int16)
+        if self.channels > 1:
+            samples = samples[::self.channels]
+
+        # Запись в заранее выделенный слот, без аллокаций в аудиопотоке.
+        # Единственный писатель и единственный читатель: callback меняет
+        # только _ring_w и _wake_pos, _ring_r меняет только читатель,
+        # поэтому блокировки не нужны
+        slot = self._ring_w & self._ring_mask
+        np.copyto(self._ring[slot], samples)
+
+        # Уровень блока считается один раз и используется и детектором,
+        # и проверкой тишины при записи
+        volume = _kernels.rms_i16(self._ring[slot])
+        self._ring_level[slot] = volume
+        self._ring_w += 1
+
+        if not self.is_recording and self.detect_activation_word(self._ring[slot], volume):
+            # Запись команды начинается сразу после ключевого слова
+            self._wake_pos = self._ring_w
+            self.is_recording = True
+            self._wake_event.set()
+
+        self._ring_event.set()
+
+    def read_audio_chunks(self, max_chunks, timeout):
+        """
+        Чтение накопившихся блоков (не более max_chunks) из кольцевого буфера
 
-        audio_chunk = indata.copy()
-        self.audio_queue.put(audio_chunk)
+        Возвращает список представлений буфера (действительны до перезаписи
+        кольца) и массив RMS этих блоков или (None, None) по таймауту
+        """
+        while self._ring_w == self._ring_r:
+            self._ring_event.clear()
+            if self._ring_w != self._ring_r:
+                break
+            if not self._ring_event.wait(timeout):
+                return None, None
+
+        slots = self._ring.shape[0]
+        if self._ring_w - self._ring_r > slots:
+            self.print_debug("Переполнение аудиобуфера, старые данные отброшены")
+            self._ring_r = self._ring_w - slots
+
+        count = min(self._ring_w - self._ring_r, max_chunks)
+        indices = (self._ring_r + np.arange(count)) & self._ring_mask
+        self._ring_r += count
+        return [self._ring[i] for i in indices], self._ring_level[indices]
 
     def adapt_to_noise(self, duration=3.0):
         """Адаптация к фоновому шуму"""
         self.print_debug("Адаптация к фоновому шуму...")
 
-        noise_samples = []
-        start_time = time.time()
+        # Накопление суммы модулей прямо в callback, без хранения записи
+        self._noise_abs_sum = 0
+        self._noise_count = 0
 
         def noise_callback(indata, frames, time, status):
-            noise_samples.append(indata.copy())
+            self._noise_abs_sum += _kernels.abs_sum_i16(indata.reshape(-1))
+            self._noise_count += indata.size
 
         with sd.InputStream(callback=noise_callback,
                             channels=self.channels,
+                            dtype='int16',
                             samplerate=self.sample_rate,
                             blocksize=1024):
             time.sleep(duration)
 
-        if noise_samples:
-            noise_data = np.concatenate(noise_samples, axis=0)
-            self.noise_profile = np.mean(np.abs(noise_data))
+        if self._noise_count:
+            self.noise_profile = self._noise_abs_sum / self._noise_count / _kernels.INT16_SCALE
             self.noise_adapted = True
 
+            self._silence_thresh = max(self.noise_profile * 2.0, self.silence_threshold)  # увеличил множитель
+            self._fallback_thresh = self.noise_profile * 4
+            self._kw_gate_thresh = self.noise_profile * 1.5
+
             self.print_debug(f"Адаптация завершена. Уровень шума: {self.noise_profile:.4f}")
 
-    def detect_activation_word(self, audio_data):
+    def detect_activation_word(self, audio_data, volume=None):
         """Детектирование ключевого слова с помощью Porcupine"""
         if self.porcupine is None:
-            return self.detect_activation_word_fallback(audio_data)
+            return self.detect_activation_word_fallback(audio_data, volume)
+
+        # Дешёвая проверка уровня перед нейросетевым детектором: при
+        # продолжительной тишине фреймы в Porcupine не передаются
+        if volume is None:
+            volume = _rms(audio_data)
+        if volume < self._kw_gate_thresh:
+            self._kw_silent_frames += 1
+            if self._kw_silent_frames > self.KW_GATE_HANGOVER:
+                self._kw_fill = 0
+                return False
+        else:
+            self._kw_silent_frames = 0
 
         try:
-            if len(audio_data.shape) > 1:
-                audio_data = audio_data.flatten()
-
-            if np.max(np.abs(audio_data)) > 0:
-                audio_data = audio_data / np.max(np.abs(audio_data))
-
-            audio_int16 = (audio_data * 32767).astype(np.int16)
-
-            required_length = self.porcupine.frame_length
-            if len(audio_int16) < required_length:
-                audio_int16 = np.pad(audio_int16, (0, required_length - len(audio_int16)))
-            elif len(audio_int16) > required_length:
-                audio_int16 = audio_int16[:required_length]
+            # Поток уже отдаёт int16 в формате, который ожидает Porcupine
+            audio_int16 = audio_data.reshape(-1)
+            frame_length = self.porcupine.frame_length
+
+            # Porcupine получает подряд идущие полные фреймы: ни один отсчёт
+            # не теряется на обрезке и не подменяется нулями
+            detected = False
+            pos = 0
+            total = audio_int16.shape[0]
+            while pos < total:
+                if self._kw_fill == 0 and total - pos >= frame_length:
+                    frame = audio_int16[pos:pos + frame_length]
+                    pos += frame_length
+                else:
+                    take = min(frame_length - self._kw_fill, total - pos)
+                    self._kw_buf[self._kw_fill:self._kw_fill + take] = audio_int16[pos:pos + take]
+                    self._kw_fill += take
+                    pos += take
+                    if self._kw_fill < frame_length:
+                        break
+                    frame = self._kw_buf
+                    self._kw_fill = 0
 
-            keyword_index = self.porcupine.process(audio_int16)
+                if self._porcupine_process(frame) >= 0:
+                    detected = True
 
-            if keyword_index >= 0:
-                self.print_debug(f"Ключевое слово обнаружено!")
+            if detected:
+                self._kw_fill = 0
                 return True
 
         except Exception as e:
-            self.print_debug(f"Ошибка Porcupine обработки: {e}")
+            self.print_debug_hot("Ошибка Porcupine обработки: {}", e)
 
         return False
 
-    def detect_activation_word_fallback(self, audio_data):
+    def detect_activation_word_fallback(self, audio_data, volume=None):
         """Fallback детектор если Porcupine не доступен"""
-        volume = np.sqrt(np.mean(audio_data ** 2))
-        noise_threshold = self.noise_profile * 4 if self.noise_adapted else 0.05
-
-        if volume > noise_threshold:
-            self.print_debug(f"Fallback: Обнаружена речь (уровень: {volume:.4f})")
+        if volume is None:
+            volume = _rms(audio_data)
+        if volume > self._fallback_thresh:
+            self.print_debug_hot("Fallback: Обнаружена речь (уровень: {:.4f})", volume)
             return True
 
         return False
@@ -197,23 +418,6 @@ class VoiceActivation:
             self.porcupine.delete()
         self.print_debug("Ресурсы Porcupine освобождены")
 
-    def is_silence(self, audio_chunk):
-        """Проверка, является ли аудио-фрагмент тишиной"""
-        if len(audio_chunk) == 0:
-            return True
-
-        volume = np.sqrt(np.mean(audio_chunk ** 2))  # RMS вместо mean abs
-        threshold = self.silence_threshold
-
-        if self.noise_adapted:
-            threshold = max(self.noise_profile * 2.0, self.silence_threshold)  # увеличил множитель
-
-        is_silent = volume < threshold
-        if self.debug_mode and not is_silent:
-            self.print_debug(f"Уровень звука: {volume:.4f}, порог: {threshold:.4f}")
-
-        return is_silent
-
     def save_debug_recording(self, audio_data, filename_prefix="debug"):
         """Сохранение записи для отладки"""
         if not self.debug_mode:
@@ -222,12 +426,9 @@ class VoiceActivation:
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         filename = f"logs/{filename_prefix}_{timestamp}.wav"
 
-        # Нормализуем данные перед сохранением
-        audio_data = audio_data / np.max(np.abs(audio_data)) if np.max(np.abs(audio_data)) > 0 else audio_data
-
         try:
-            scipy.io.wavfile.write(filename, self.sample_rate,
-                                   (audio_data * 32767).astype(np.int16))
+            # Запись уже в int16, сохраняем без преобразований
+            scipy.io.wavfile.write(filename, self.sample_rate, audio_data.astype(np.int16, copy=False))
             self.print_debug(f"Запись сохранена: {filename}")
         except Exception as e:
             self.print_debug(f"Ошибка сохранения записи: {e}")
@@ -236,39 +437,64 @@ class VoiceActivation:
         """Запись до обнаружения тишины"""
         self.print_debug("Начало записи команды...")
 
-        recorded_audio = []
-        silence_start_time = None
+        record_buf = self._record_buf
+        cursor = 0
+        silent_blocks = 0
         recording_start_time = time.time()
 
-        while self.is_recording:
-            try:
-                audio_chunk = self.audio_queue.get(timeout=1.0)
-                recorded_audio.append(audio_chunk)
+        # Чтение начинается с блока, следующего за ключевым словом
+        self._ring_r = self._wake_pos
 
-                current_chunk = audio_chunk
+        # Распознавание идёт параллельно записи
+        if self.speech_recognizer:
+            self.speech_recognizer.reset_recognizer()
 
-                if self.is_silence(current_chunk):
-                    if silence_start_time is None:
-                        silence_start_time = time.time()
-                        self.print_debug(f"Начало тишины...")
-                    elif time.time() - silence_start_time >= self.silence_duration:
-                        self.print_debug("Обнаружена продолжительная тишина, завершение записи")
-                        break
-                else:
-                    if silence_start_time is not None:
-                        self.print_debug("Голос обнаружен, сброс таймера тишины")
-                    silence_start_time = None
+        while self.is_recording:
+            # Блоки обрабатываются пачками: тишина определяется по уже
+            # посчитанным в callback уровням одним векторным сравнением
+            chunks, levels = self.read_audio_chunks(self.RECORD_BATCH, timeout=1.0)
+            if chunks is None:
+                continue
 
-                if time.time() - recording_start_time > 30:
-                    self.print_debug("Превышено время записи")
-                    break
+            batch_start = cursor
+            for audio_chunk in chunks:
+                n = min(audio_chunk.shape[0], record_buf.shape[0] - cursor)
+                record_buf[cursor:cursor + n] = audio_chunk[:n]
+                cursor += n
+
+            if self.speech_recognizer and cursor > batch_start:
+                self.speech_recognizer.accept_chunk(record_buf[batch_start:cursor])
+
+            threshold = self._silence_thresh
+            silent = levels < threshold
+            voiced = np.flatnonzero(~silent)
+            frame_idx = self._frame_idx
+            self._frame_idx += silent.size
+            if voiced.size:
+                if silent_blocks:
+                    self.print_debug("Голос обнаружен, сброс таймера тишины")
+                # Пачка может закончиться тишиной после голоса
+                silent_blocks = silent.size - 1 - int(voiced[-1])
+                if silent_blocks:
+                    self.print_debug(f"Начало тишины...")
+                if self.debug_mode and (frame_idx >> 6) != (self._frame_idx >> 6):
+                    self.print_debug_hot("Уровень звука: {:.4f}, порог: {:.4f}",
+                                         float(levels[voiced[-1]]), threshold)
+            else:
+                if not silent_blocks:
+                    self.print_debug(f"Начало тишины...")
+                silent_blocks += silent.size
 
-            except queue.Empty:
-                continue
+            # Длительность тишины по числу отсчётов, а не по системным часам
+            if silent_blocks * self._ring.shape[1] >= self.silence_duration * self.sample_rate:
+                self.print_debug("Обнаружена продолжительная тишина, завершение записи")
+                break
+
+            if time.time() - recording_start_time > self.MAX_RECORD_SECONDS or cursor >= record_buf.shape[0]:
+                self.print_debug("Превышено время записи")
+                break
 
-        if recorded_audio:
-            return np.concatenate(recorded_audio, axis=0)
-        return np.array([])
+        return record_buf[:cursor].copy()
 
     def start_listening(self):
         """Запуск прослушивания"""
@@ -286,34 +512,35 @@ class VoiceActivation:
         if not self.noise_adapted:
             self.adapt_to_noise()
 
+        blocksize = self.porcupine.frame_length if self.porcupine else 1024
+        self._reset_ring(blocksize)
+
         try:
-            with sd.InputStream(callback=self.audio_callback,
-                                channels=self.channels,
-                                samplerate=self.sample_rate,
-                                blocksize=self.porcupine.frame_length if self.porcupine else 1024):
+            with sd.RawInputStream(callback=self.audio_callback,
+                                   channels=self.channels,
+                                   dtype='int16',
+                                   samplerate=self.sample_rate,
+                                   blocksize=blocksize):
 
                 self.print_debug("Ожидание ключевого слова 'Эмили'...")
 
                 while self.is_listening:
-                    try:
-                        audio_chunk = self.audio_queue.get(timeout=0.5)
-
-                        if self.detect_activation_word(audio_chunk):
-                            self.activation_count += 1
-                            self.print_debug("Ключевое слово обнаружено!")
+                    # Ключевое слово ищется в audio_callback
+                    if not self._wake_event.wait(timeout=0.5):
+                        continue
+                    self._wake_event.clear()
 
-                            self.is_recording = True
-                            command_audio = self.record_until_silence()
-                            self.is_recording = False
+                    self.activation_count += 1
+                    self.print_debug("Ключевое слово обнаружено!")
 
-                            if command_audio.size > 0:
-                                self.save_debug_recording(command_audio, "command")
-                                self.process_command(command_audio)
+                    command_audio = self.record_until_silence()
+                    self.is_recording = False
 
-                            self.print_debug("Ожидание следующей активации...")
+                    if command_audio.size > 0:
+                        self.save_debug_recording(command_audio, "command")
+                        self.process_command(command_audio)
 
-                    except queue.Empty:
-                        continue
+                    self.print_debug("Ожидание следующей активации...")
 
         except Exception as e:
             self.print_debug(f"Ошибка в аудиопотоке: {e}")
@@ -331,28 +558,22 @@ class VoiceActivation:
             # Распознаем речь
             if self.speech_recognizer:
                 stt_start = time.perf_counter()
-                recognized_text = self.speech_recognizer.recognize_audio(audio_data)
+                if self.speech_recognizer.stream_incomplete:
+                    # Модель загрузилась не к началу записи: распознаём её целиком
+                    self.speech_recognizer.reset_recognizer()
+                    recognized_text = self.speech_recognizer.recognize_audio(audio_data)
+                else:
+                    # Аудио уже передано распознавателю во время записи
+                    recognized_text = self.speech_recognizer.final_result()
                 stt_time = time.perf_counter() - stt_start
 
                 if recognized_text:
                     self.print_debug(f"Распознанная команда: '{recognized_text}'")
                     self.print_debug(f"Время STT: {stt_time:.3f} сек")
 
-                    nlp_start = time.perf_counter()
-                    response = self.command_handler.execute_command(recognized_text)
-                    nlp_time = time.perf_counter() - nlp_start
-
-                    tts_start = time.perf_counter()
-                    self.print_debug(f"Ответ: {response}")
-                    tts_time = time.perf_counter() - tts_start
-
-                    total_time = time.perf_counter() - start_time
-                    self.print_debug(
-                        f"Общее время отклика: {total_time:.3f} сек (STT: {stt_time:.3f}, NLP: {nlp_time:.3f}, TTS_queuing: {tts_time:.3f})")
-
-                    with open("response_times.log", "a") as f:
-                        f.write(
-                            f"{time.strftime('%Y-%m-%d %H:%M:%S')}, {total_time:.3f}, {stt_time:.3f}, {nlp_time:.3f}, {tts_time:.3f}, '{recognized_text}'\n")
+                    # Выполнение команды в отдельном потоке: прослушивание
+                    # ключевого слова продолжается сразу
+                    self._cmd_pool.submit(self._run_command, recognized_text, start_time, stt_time)
 
                 else:
                     self.print_debug("Речь не распознана")
@@ -363,11 +584,76 @@ class VoiceActivation:
             if self.speech_recognizer:
                 self.speech_recognizer.reset_recognizer()
 
+    def _run_command(self, recognized_text, start_time, stt_time):
+        """Выполнение распознанной команды (в потоке обработчика команд)"""
+        try:
+            nlp_start = time.perf_counter()
+            response = self.command_handler.execute_command(recognized_text)
+            nlp_time = time.perf_counter() - nlp_start
+
+            tts_start = time.perf_counter()
+            self.print_debug(f"Ответ: {response}")
+            tts_time = time.perf_counter() - tts_start
+
+            total_time = time.perf_counter() - start_time
+            self.print_debug(
+                f"Общее время отклика: {total_time:.3f} сек (STT: {stt_time:.3f}, NLP: {nlp_time:.3f}, TTS_queuing: {tts_time:.3f})")
+
+            self._log_queue.put(
+                f"{time.strftime('%Y-%m-%d %H:%M:%S')}, {total_time:.3f}, {stt_time:.3f}, {nlp_time:.3f}, {tts_time:.3f}, '{recognized_text}'\n")
+
+        except Exception as e:
+            self.print_debug(f"Ошибка обработки команды: {e}")
+
+    def _write_log_lines(self, lines):
+        """Запись пачки строк журнала"""
+        if not lines:
+            return
+        if self._log_fp is None:
+            self._log_fp = open("response_times.log", "a", buffering=1 << 16)
+        self._log_fp.writelines(lines)
+        self._log_fp.flush()
+
+    def _log_writer(self):
+        """Фоновая запись журнала времени отклика пачками"""
+        while True:
+            lines = []
+            line = self._log_queue.get()
+            deadline = time.monotonic() + 0.5
+            # Строки за полсекунды собираются в одну запись; None - сигнал
+            # завершения, после него накопленное дописывается до выхода
+            while line is not None:
+                lines.append(line)
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    line = self._log_queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+            try:
+                self._write_log_lines(lines)
+            except Exception as e:
+                self.print_debug(f"Ошибка записи журнала: {e}")
+            if line is None:
+                if self._log_fp is not None:
+                    self._log_fp.close()
+                return
+
+    def _close_log(self):
+        """Дозапись оставшихся строк и закрытие журнала"""
+        if self._log_thread.is_alive():
+            self._log_queue.put(None)
+            self._log_thread.join(timeout=2.0)
+
     def stop_listening(self):
         """Остановка прослушивания"""
         self.is_listening = False
         self.is_recording = False
 
+        if hasattr(self, '_cmd_pool'):
+            self._cmd_pool.shutdown(wait=False, cancel_futures=True)
+
         if hasattr(self, 'command_handler') and self.command_handler.tts_engine:
             self.command_handler.tts_engine.shutdown()
 